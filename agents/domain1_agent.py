@@ -2,50 +2,104 @@
 Pydantic AI Agent for Domain 1: Demographics & Vulnerability Factors Survey
 N-children support using template questions from prompts/survey_questions.md
 
-Expected survey_questions.md (parsed by load_questions) contains at least 5 quoted lines:
-0) Q1: number of children under five
-1) Child age template question (generic "this child" wording)
-2) Child malnutrition template question (generic "this child" wording)
-3) Household vulnerability question (elderly/immunocompromised)
-4) Caregiver question
-"""
-import sys
-import re
-from pathlib import Path
-from typing import Optional
+Questions are routed deterministically by Domain1SurveyFlow; the LLM is only used to
+validate answers, to answer clarification requests, and to extract structured data.
 
-from pydantic_ai import Agent
+Expected survey_questions.md (parsed by load_questions) contains at least 4 quoted lines:
+0) Q1: number of children under five
+1) Child template question asking for age in months AND malnutrition signs
+   (generic "this child" wording, one turn per child)
+2) Household vulnerability question (elderly/immunocompromised)
+3) Caregiver question
 
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+Run standalone from the project root with: python -m agents.domain1_agent
+"""
+from __future__ import annotations
 
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    # pydantic_ai pulls in the whole OpenAI client (a few hundred ms), so it is
+    # imported inside the agent factories, on first use
+    from openai import AsyncOpenAI
+    from pydantic_ai import Agent
+    from pydantic_ai.messages import ModelMessage
+    from pydantic_ai.models.openai import OpenAIChatModel
+
+import llm_cache
 from models.domain1 import Domain1Data, Domain1SurveyDeps, ValidationDecision
 from util import (
     get_conversation_system_prompt,
     get_extraction_system_prompt,
     get_validation_system_prompt,
+    is_clarification_request,
     load_questions,
+    needs_llm_extraction,
+    parse_answers,
+    is_clear_answer,
+    parse_clear_count,
+    parse_count,
 )
 
-# Load questions from external file
-QUESTIONS = load_questions()
-assert len(QUESTIONS) >= 5, f"Expected at least 5 questions, got {len(QUESTIONS)}"
+# Number of most recent messages the conversation agent sees (besides the first request,
+# which carries the system prompt). Older answers survive in the deps.answers snapshot.
+HISTORY_WINDOW = 6
+
+# Console banner for the standalone runner
+BANNER = "=" * 60
+
+
+@lru_cache(maxsize=1)
+def get_questions() -> tuple[str, ...]:
+    """Question templates from survey_questions.md, read on first use rather than at import."""
+    questions = tuple(load_questions())
+    assert len(questions) >= 4, f"Expected at least 4 questions, got {len(questions)}"
+    return questions
+
+
+@dataclass(frozen=True, slots=True)
+class SurveyPlan:
+    """
+    The question script a Domain1SurveyFlow walks through: the opening count question,
+    the per-child template (asked once per child), then the closing household questions
+    with their answer slots.
+    """
+    count_question: str
+    child_template: str
+    household: tuple[tuple[str, str], ...]  # (answer slot, question)
+
+    @classmethod
+    def from_questions(cls, questions: tuple[str, ...]) -> SurveyPlan:
+        """Plan for the question order of survey_questions.md."""
+        return cls(
+            count_question=questions[0],
+            child_template=questions[1],
+            household=(("has_vulnerable_members", questions[2]), ("primary_caregiver", questions[3])),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_survey_plan() -> SurveyPlan:
+    """The Domain 1 survey plan (built once from the question file)."""
+    return SurveyPlan.from_questions(get_questions())
+
+
+def __getattr__(name: str):
+    # Keep the module-level QUESTIONS name working without loading it at import
+    if name == "QUESTIONS":
+        return get_questions()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -----------------------------
 # Helpers for dynamic questions
 # -----------------------------
-def extract_nonneg_int(text: str, max_n: int = 20) -> Optional[int]:
-    """Extract a non-negative integer from free text. Return None if not found/out of range."""
-    m = re.search(r"\b(\d+)\b", str(text or ""))
-    if not m:
-        return None
-    n = int(m.group(1))
-    if 0 <= n <= max_n:
-        return n
-    return None
-
-
 def ordinal_word(i: int) -> str:
     """1->first, 2->second, 3->third, 4->fourth..."""
     mapping = {1: "first", 2: "second", 3: "third", 4: "fourth", 5: "fifth"}
@@ -57,172 +111,501 @@ def label_child_question(template: str, child_i: int) -> str:
     Lightly label a generic template question for the i-th child, without relying on
     'first/second' being present in the template.
     Example:
-      template: "Please tell me the age in months of this child under five."
-      -> "For the third child: Please tell me the age in months of this child under five."
+      template: "Please tell me the age in months of this child under five, and ..."
+      -> "For the third child: Please tell me the age in months of this child under five, and ..."
     """
     ordw = ordinal_word(child_i)
     return f"For the {ordw} child: {template}"
 
 
+def keep_recent_messages(messages: list[ModelMessage]) -> list[ModelMessage]:
+    """History processor: keep the first request (system prompt) plus the last HISTORY_WINDOW messages."""
+    if len(messages) <= HISTORY_WINDOW + 1:
+        return messages
+    return [messages[0], *messages[-HISTORY_WINDOW:]]
+
+
 # -----------------------------
 # Agents
 # -----------------------------
+@lru_cache(maxsize=1)
+def get_openai_client() -> AsyncOpenAI:
+    """The single OpenAI client (one keep-alive connection pool) shared by every agent."""
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=120),
+    )
+    return AsyncOpenAI(http_client=http_client)
+
+
+@lru_cache(maxsize=4)
+def get_model(model_name: str = "gpt-4o") -> OpenAIChatModel:
+    """OpenAI chat model on the shared client."""
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    return OpenAIChatModel(model_name, provider=OpenAIProvider(openai_client=get_openai_client()))
+
+
+@lru_cache(maxsize=1)
 def get_conversation_agent() -> Agent:
-    """Get the conversational agent (returns text, not structured data)"""
+    """Get the conversational agent (returns text, not structured data). Built once per process."""
+    from pydantic_ai import Agent
+
     return Agent(
-        "openai:gpt-4o",
+        get_model(),
         deps_type=Domain1SurveyDeps,
         system_prompt=get_conversation_system_prompt(),
+        history_processors=[keep_recent_messages],
     )
 
 
+@lru_cache(maxsize=1)
 def get_extraction_agent() -> Agent:
-    """Get the extraction agent (converts conversation to structured data)"""
+    """Get the extraction agent (converts conversation to structured data). Built once per process."""
+    from pydantic_ai import Agent
+
     return Agent(
-        "openai:gpt-4o",
+        get_model(),
         output_type=dict,
         model_settings={"temperature": 0},
         system_prompt=get_extraction_system_prompt(),
     )
 
 
+@lru_cache(maxsize=1)
 def get_validation_agent() -> Agent:
-    """Get the validation agent (validates answers and generates follow-ups)"""
+    """Get the validation agent (validates answers and generates follow-ups). Built once per process."""
+    from pydantic_ai import Agent
+
     return Agent(
-        "openai:gpt-4o",
+        # A small model is enough to judge a single short answer
+        get_model("gpt-4o-mini"),
         output_type=ValidationDecision,
         model_settings={"temperature": 0},
         system_prompt=get_validation_system_prompt(),
     )
 
 
+def prepare_agents():
+    """
+    Build the cached agents, model client, prompts and survey plan up front (e.g. at
+    server start) so the first respondent turn doesn't pay for their construction.
+    """
+    get_survey_plan()
+    get_conversation_agent()
+    get_extraction_agent()
+    get_validation_agent()
+
+
+async def warm_up_connection():
+    """
+    Open the HTTPS connection to the model provider ahead of the first LLM call
+    (a token-free model listing). Best effort: failures are ignored.
+    """
+    try:
+        await get_openai_client().models.list()
+    except Exception:
+        pass
+
+
+# -----------------------------
+# Deterministic question router
+# -----------------------------
+class Domain1SurveyFlow:
+    """
+    Question router for one Domain 1 survey run (shared by the CLI and the web app).
+
+    Picking the next question is pure state-machine logic, so no LLM is involved:
+    the runtime question list starts with Q1 and is expanded per child once the
+    number of children is known.
+    """
+
+    def __init__(self, deps: Optional[Domain1SurveyDeps] = None, plan: Optional[SurveyPlan] = None):
+        self.deps = deps or Domain1SurveyDeps()
+        self.plan = plan or get_survey_plan()
+        self.questions = [self.plan.count_question]
+        # Answer slot per runtime question (flat keys understood by Domain1Data.from_answers)
+        self.slots = ["num_children_under_5"]
+        self.followup_used = [False]
+        # First answer to a child question that needed a follow-up (the reply may only
+        # supply the missing part, so both are kept together)
+        self.partial_answer: Optional[str] = None
+        # Extraction started speculatively during the last validation (see answer_turn)
+        self.extraction: Optional[asyncio.Task] = None
+        self.q_idx = 0
+        self.n_children: Optional[int] = None
+        # Conversation-agent message history (only used for clarification requests)
+        self.messages: list[ModelMessage] = []
+
+    @property
+    def is_complete(self) -> bool:
+        return self.q_idx >= len(self.questions)
+
+    @property
+    def current_question(self) -> str:
+        return self.questions[self.q_idx]
+
+    def ask_current(self) -> str:
+        """Record the current question in the transcript and return its display text."""
+        q_text = f'"{self.current_question}"'
+        self.deps.conversation_history.append(("Agent", q_text))
+        return q_text
+
+    def combine_with_partial(self, answer: str) -> str:
+        """Join a follow-up reply to a child question with the first answer to it."""
+        if self.partial_answer is None:
+            return answer
+        return f"{self.partial_answer}; {answer}"
+
+    def need_followup(self, answer: str):
+        """Mark the current question as followed up, keeping a partial child answer."""
+        self.followup_used[self.q_idx] = True
+        if self.slots[self.q_idx].startswith("child"):
+            self.partial_answer = answer
+
+    def accept(self, answer: str, n_children: Optional[int] = None):
+        """Store the answer for the current question and move on (Q1 may pass its parsed count)."""
+        self.deps.answers[self.slots[self.q_idx]] = answer
+        if self.q_idx == 0:
+            self._expand_child_questions(answer, n_children)
+        self.followup_used[self.q_idx] = False
+        self.partial_answer = None
+        self.q_idx += 1
+
+    def give_up(self, reason: str):
+        """Record the current question as NA and move on."""
+        self.deps.conversation_history.append(
+            ("System", f"Question recorded as NA. Q{self.q_idx+1}: {self.current_question} | Reason: {reason}")
+        )
+        self.followup_used[self.q_idx] = False
+        self.partial_answer = None
+        self.q_idx += 1
+
+    def _expand_child_questions(self, q1_answer: str, n_children: Optional[int] = None):
+        """After Q1, ask the child question once per child, then the household questions."""
+        if n_children is None:
+            # Same parser as extraction, so number words ("two") count too
+            n_children = parse_count(q1_answer, max_n=20)
+        if n_children is None:
+            # Should be caught by validator, but keep safe fallback
+            n_children = 0
+        self.n_children = n_children
+
+        # Extend the Q1-only lists in place (Q1's own entries are kept)
+        plan = self.plan
+        # One combined answer per child; parse_answers splits it into age and malnutrition
+        self.questions.extend([label_child_question(plan.child_template, i) for i in range(1, n_children + 1)])
+        self.slots.extend([f"child{i}" for i in range(1, n_children + 1)])
+
+        self.questions.extend(question for _, question in plan.household)
+        self.slots.extend(slot for slot, _ in plan.household)
+        self.followup_used.extend([False] * (n_children + len(plan.household)))
+
+
+async def clarify(
+    flow: Domain1SurveyFlow, user_input: str, on_delta: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Let the conversation agent answer a respondent's question about the current survey question.
+    When `on_delta` is given the reply is streamed to it as it is generated.
+    """
+    conversation_agent = get_conversation_agent()
+    prompt = (
+        f"Answers so far: {json.dumps(flow.deps.answers)}\n"
+        f'Current question: "{flow.current_question}"\n'
+        f"Respondent: {user_input}"
+    )
+    # The reply depends on the answers so far and on earlier clarifications (message_history),
+    # so the key covers the full prompt and the transcript, not just the current question:
+    # only a replay of the same conversation is served from the cache
+    key = llm_cache.make_key(get_conversation_system_prompt(), prompt, flow.deps.transcript())
+    if on_delta is None:
+        reply, result = await llm_cache.cached_run(
+            conversation_agent,
+            prompt,
+            key,
+            deps=flow.deps,
+            message_history=flow.messages,
+        )
+    else:
+        reply, result = await llm_cache.cached_run_stream(
+            conversation_agent,
+            prompt,
+            key,
+            on_delta,
+            stop="SURVEY_COMPLETE",
+            deps=flow.deps,
+            message_history=flow.messages,
+        )
+    if result is not None:
+        flow.messages = result.all_messages()
+
+    # Completion is decided by the flow, never by the conversation agent
+    if "SURVEY_COMPLETE" in reply or not reply.strip():
+        reply = reply.split("SURVEY_COMPLETE", 1)[0].strip()
+        if not reply:
+            reply = f'"{flow.current_question}"'
+            if on_delta is not None:
+                on_delta(reply)
+    return reply
+
+
+async def validate_answer(
+    flow: Domain1SurveyFlow,
+    answer: str,
+    on_partial: Optional[Callable[[ValidationDecision], None]] = None,
+) -> ValidationDecision:
+    """
+    Ask the LLM validator whether `answer` answers the current question.
+    With `on_partial`, the decision is streamed and each partial decision is passed to it.
+    """
+    deps = flow.deps
+    validation_agent = get_validation_agent()
+    followup_used = flow.followup_used[flow.q_idx]
+    # Fixed system prompt + one stable JSON user message keeps the request prefix
+    # byte-identical across turns (provider-side prompt caching)
+    validation_prompt = json.dumps(
+        {"question_asked": flow.current_question, "respondent_answer": answer, "followup_used": followup_used},
+        sort_keys=True,
+    )
+    key = llm_cache.make_key(
+        get_validation_system_prompt(), flow.current_question, llm_cache.normalize(answer), str(followup_used)
+    )
+
+    # Any accepted answer the rule parser doesn't read unambiguously sends extraction to
+    # the LLM once the survey ends. On the last question, start that call alongside the validator and
+    # keep it only if the answer is accepted.
+    speculative: Optional[asyncio.Task] = None
+    if flow.q_idx == len(flow.questions) - 1:
+        tentative_answers = {**deps.answers, flow.slots[flow.q_idx]: answer}
+        if needs_llm_extraction(tentative_answers):
+            tentative = Domain1SurveyDeps(list(deps.conversation_history), tentative_answers)
+            speculative = asyncio.create_task(extract_domain1_data(tentative))
+
+    decision: ValidationDecision
+    try:
+        if on_partial is None:
+            decision, _ = await llm_cache.cached_run(validation_agent, validation_prompt, key)
+        else:
+            decision, _ = await llm_cache.cached_run_stream_output(
+                validation_agent, validation_prompt, key, on_partial
+            )
+    except BaseException:
+        if speculative is not None:
+            speculative.cancel()
+        raise
+    if speculative is not None:
+        if decision.status == "OK":
+            flow.extraction = speculative
+        else:
+            speculative.cancel()
+    return decision
+
+
+async def answer_turn(
+    flow: Domain1SurveyFlow, user_input: str, on_delta: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Process one respondent answer and return what the agent says next:
+    a clarification, a follow-up, the next question, or SURVEY_COMPLETE.
+
+    If `on_delta` is given, the reply is also written to it; clarifications are
+    streamed token by token, everything else arrives as one chunk.
+    """
+    deps = flow.deps
+    deps.conversation_history.append(("Respondent", user_input))
+
+    def emit(text: str) -> str:
+        if on_delta is not None:
+            on_delta(text)
+        return text
+
+    # Only questions about the question itself need the conversation LLM
+    slot = flow.slots[flow.q_idx]
+    if is_clarification_request(user_input, slot):
+        reply = await clarify(flow, user_input, on_delta)
+        deps.conversation_history.append(("Agent", reply))
+        return reply
+
+    # Validate answer: answers the rule parser reads unambiguously are accepted locally,
+    # only the rest go to the LLM validator
+    answer = flow.combine_with_partial(user_input)
+    # Follow-up text already written to on_delta while the decision streamed in
+    streamed = ""
+
+    def stream_followup(partial: ValidationDecision):
+        nonlocal streamed
+        text = partial.followup or ""
+        if partial.status == "NEED_FOLLOWUP" and len(text) > len(streamed) and text.startswith(streamed):
+            on_delta(text[len(streamed):])
+            streamed = text
+
+    # Q1: a single clear count is both the validation and the value used to expand the flow.
+    # An answer phrased as a question ("2?") is left to the validator, which can follow up.
+    hedged = user_input.rstrip().endswith("?")
+    n_children = parse_clear_count(answer) if flow.q_idx == 0 and not hedged else None
+    if n_children is not None or (not hedged and is_clear_answer(slot, answer)):
+        decision = ValidationDecision(status="OK")
+    else:
+        decision = await validate_answer(flow, answer, stream_followup if on_delta is not None else None)
+
+    # Need follow-up
+    if decision.status == "NEED_FOLLOWUP":
+        flow.need_followup(user_input)
+        followup_text = (decision.followup or "Could you please clarify?").strip()
+        deps.conversation_history.append(("Agent", followup_text))
+        if not streamed:
+            return emit(followup_text)
+        if followup_text.startswith(streamed):
+            emit(followup_text[len(streamed):])
+        return followup_text
+
+    if decision.status == "GIVE_UP":
+        # Give up after 1 follow-up
+        flow.give_up("Unclear after 1 follow-up")
+    else:
+        flow.accept(answer, n_children)
+
+    if flow.is_complete:
+        deps.conversation_history.append(("Agent", "SURVEY_COMPLETE"))
+        return emit("SURVEY_COMPLETE")
+    return emit(flow.ask_current())
+
+
+async def extract_domain1_data(deps: Domain1SurveyDeps) -> Domain1Data:
+    """
+    Build Domain1Data from the recorded answers with the rule-based parser.
+    The LLM extractor is used instead when an accepted answer isn't one the rules
+    read unambiguously (e.g. "No elderly, but my husband has HIV").
+    """
+    if not needs_llm_extraction(deps.answers):
+        return Domain1Data.from_answers(parse_answers(deps.answers), strict_len=False, trusted=True)
+
+    extraction_agent = get_extraction_agent()
+    # Header and transcript are joined in one pass (no second copy of the transcript)
+    prompt = deps.transcript(header="Extract the household data from this conversation:\n")
+    # Deterministic (temperature 0), so a replayed or retried transcript is served from the cache
+    key = llm_cache.make_key(get_extraction_system_prompt(), prompt)
+    answers, _ = await llm_cache.cached_run(extraction_agent, prompt, key)
+    answers = answers or {}
+    return Domain1Data.from_answers(answers, strict_len=False)
+
+
+async def extract_flow_data(flow: Domain1SurveyFlow) -> Domain1Data:
+    """Structured data for a completed flow, reusing the speculative extraction if one was kept."""
+    if flow.extraction is not None:
+        return await flow.extraction
+    return await extract_domain1_data(flow.deps)
+
+
 # -----------------------------
 # Main Survey Runner
 # -----------------------------
+# Bytes read from stdin past the last returned line
+_stdin_pending = bytearray()
+
+
+async def _read_stdin_chunk(fd: int) -> bytes:
+    """
+    One os.read() from stdin without blocking the event loop. Ttys and pipes are
+    watched with loop.add_reader, so a pending read is simply dropped on cancellation
+    (no thread is left blocked in input()). Where that isn't supported (regular files,
+    Windows) the read goes to the default executor; a file read returns right away.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_readable():
+        if not future.done():
+            try:
+                future.set_result(os.read(fd, 4096))
+            except OSError as exc:
+                future.set_exception(exc)
+
+    try:
+        loop.add_reader(fd, on_readable)
+    except (NotImplementedError, PermissionError):
+        return await loop.run_in_executor(None, os.read, fd, 4096)
+    try:
+        return await future
+    finally:
+        loop.remove_reader(fd)
+
+
+async def read_line(prompt: str) -> str:
+    """input() without blocking the event loop; raises EOFError at end of input."""
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    try:
+        fd = sys.stdin.fileno()
+    except (AttributeError, ValueError):
+        # Replaced stdin without a file descriptor (e.g. a notebook): plain input() in a worker
+        return await asyncio.get_running_loop().run_in_executor(None, input)
+    while b"\n" not in _stdin_pending:
+        chunk = await _read_stdin_chunk(fd)
+        if not chunk:
+            if not _stdin_pending:
+                raise EOFError
+            break
+        _stdin_pending.extend(chunk)
+    line, _, rest = bytes(_stdin_pending).partition(b"\n")
+    _stdin_pending[:] = rest
+    return line.decode(sys.stdin.encoding or "utf-8", errors="replace").rstrip("\r")
+
+
 async def run_domain1_survey() -> Optional[Domain1Data]:
     """Run the Domain 1 survey interactively via command line."""
-    validation_agent = get_validation_agent()
-    extraction_agent = get_extraction_agent()
-    deps = Domain1SurveyDeps()
-
-    # Base questions from survey_questions.md (templates)
-    q1 = QUESTIONS[0]
-    child_age_template = QUESTIONS[1]
-    child_mal_template = QUESTIONS[2]
-    household_vuln_q = QUESTIONS[3]
-    caregiver_q = QUESTIONS[4]
-
-    # Runtime questions expand after Q1
-    questions_runtime = [q1]
-    num_questions = len(questions_runtime)
-
-    q_idx = 0
-    followup_used = [False] * num_questions
-    n_children: Optional[int] = None
-
-    def record_na(idx: int, reason: str):
-        deps.conversation_history.append(
-            f"System: Question recorded as NA. Q{idx+1}: {questions_runtime[idx]} | Reason: {reason}"
-        )
+    flow = Domain1SurveyFlow()
+
+    # Plain buffered writes; stdout is flushed only when the respondent must see the text
+    # (before reading input, and per streamed chunk)
+    out = sys.stdout
+    write = out.write
 
-    async def ask_question(idx: int):
-        q_text = f'"{questions_runtime[idx]}"'
-        deps.conversation_history.append(f"Agent: {q_text}")
-        print(f"Agent: {q_text}\n")
+    def write_chunk(text: str):
+        write(text)
+        out.flush()
 
-    print("=" * 60)
-    print("DOMAIN 1: Demographics & Vulnerability Factors Survey")
-    print("=" * 60)
-    print()
+    write(f"{BANNER}\nDOMAIN 1: Demographics & Vulnerability Factors Survey\n{BANNER}\n\n")
 
-    # Ask Q1 upfront
-    await ask_question(0)
+    # Ask Q1 upfront. The next question never needs an LLM call, so the only latency
+    # left to hide behind the respondent's typing is the provider connection setup.
+    write(f"Agent: {flow.ask_current()}\n\n")
+    warmup = asyncio.create_task(warm_up_connection())
 
-    while q_idx < num_questions:
+    while not flow.is_complete:
         try:
-            user_input = input("You: ").strip()
+            out.flush()
+            user_input = (await read_line("You: ")).strip()
             if not user_input:
                 continue
-        except KeyboardInterrupt:
-            print("\n\nSurvey interrupted by user.")
+        except EOFError:
+            write("\n\nSurvey interrupted by user.\n")
+            warmup.cancel()
             return None
-
-        deps.conversation_history.append(f"Respondent: {user_input}")
-
-        # Validate answer
-        vd = await validation_agent.run(
-            f'question_asked: "{questions_runtime[q_idx]}"\n'
-            f"respondent_answer: {user_input}\n"
-            f"followup_used: {str(followup_used[q_idx]).lower()}"
-        )
-        decision: ValidationDecision = vd.response
-
-        # Need follow-up
-        if decision.status == "NEED_FOLLOWUP":
-            followup_used[q_idx] = True
-            followup_text = (decision.followup or "Could you please clarify?").strip()
-            deps.conversation_history.append(f"Agent: {followup_text}")
-            print(f"Agent: {followup_text}\n")
-            continue
-
-        # Give up after 1 follow-up
-        if decision.status == "GIVE_UP":
-            record_na(q_idx, "Unclear after 1 follow-up")
-            followup_used[q_idx] = False
-            q_idx += 1
-            if q_idx < num_questions:
-                await ask_question(q_idx)
-            continue
-
-        # Accept answer
-        followup_used[q_idx] = False
-
-        # After Q1, expand child questions
-        if q_idx == 0:
-            n_children = extract_nonneg_int(user_input, max_n=20)
-
-            # Build runtime questions based on n_children
-            new_questions = [q1]
-
-            if n_children is None:
-                # Should be caught by validator, but keep safe fallback
-                n_children = 0
-
-            # Repeat child questions for each child
-            for i in range(1, n_children + 1):
-                new_questions.append(label_child_question(child_age_template, i))
-                new_questions.append(label_child_question(child_mal_template, i))
-
-            # Then household vulnerability + caregiver
-            new_questions.append(household_vuln_q)
-            new_questions.append(caregiver_q)
-
-            questions_runtime = new_questions
-            num_questions = len(questions_runtime)
-            followup_used = [False] * num_questions
-
-        # Move to next question
-        q_idx += 1
-        if q_idx < num_questions:
-            await ask_question(q_idx)
+        except asyncio.CancelledError:
+            # Ctrl+C cancels the task; asyncio.run re-raises it as KeyboardInterrupt
+            write("\n\nSurvey interrupted by user.\n")
+            out.flush()
+            warmup.cancel()
+            raise
+
+        # Print as the reply arrives so the respondent sees the first tokens right away
+        write("Agent: ")
+        await answer_turn(flow, user_input, on_delta=write_chunk)
+        write("\n\n")
 
     # Finish
-    deps.conversation_history.append("Agent: SURVEY_COMPLETE")
-    print("Agent: SURVEY_COMPLETE\n")
-    print("=" * 60)
-    print("Survey Complete! Extracting structured data...")
-    print("=" * 60)
-
-    conversation_text = "\n".join(deps.conversation_history)
-    extraction_result = await extraction_agent.run(
-        f"Extract the household data from this conversation:\n\n{conversation_text}"
-    )
-    answers = extraction_result.response or {}
-    return Domain1Data.from_answers(answers, strict_len=False)
+    write(f"{BANNER}\nSurvey Complete! Extracting structured data...\n{BANNER}\n")
+    out.flush()
+
+    return await extract_flow_data(flow)
 
 
 if __name__ == "__main__":
-    import asyncio
     from dotenv import load_dotenv
 
     load_dotenv()
@@ -230,15 +613,18 @@ if __name__ == "__main__":
     async def main():
         result = await run_domain1_survey()
         if result:
-            print("\n" + "=" * 60)
+            print("\n" + BANNER)
             print("COLLECTED DATA:")
-            print("=" * 60)
+            print(BANNER)
             print(result.model_dump_json(indent=2))
-            print("\n" + "=" * 60)
+            print("\n" + BANNER)
             print("RISK SUMMARY:")
-            print("=" * 60)
+            print(BANNER)
             summary = result.get_risk_summary()
             for key, value in summary.items():
                 print(f"{key}: {value}")
 
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
\ No newline at end of file
@@ -2,124 +2,132 @@
 Risk Profiler Survey Bot - Gradio Web Interface
 """
 import asyncio
-import json
+import secrets
+import time
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
-import gradio as gr
-import re
+from typing import AsyncIterator, Optional
 
 from agents.domain1_agent import (
-    get_conversation_agent,
-    get_extraction_agent,
-    Domain1SurveyDeps,
+    Domain1SurveyFlow,
+    answer_turn,
+    extract_flow_data,
+    prepare_agents,
+    warm_up_connection,
 )
-from models.domain1 import Domain1Data
+from util import write_json
 
-# Load environment variables
-load_dotenv()
+GREETING = "Hello, and thank you for taking part in this household survey."
+
+# Handlers mostly wait on the LLM, so many can run at once; the OpenAI client's
+# connection pool (32) is sized above this
+CONCURRENCY_LIMIT = 16
+QUEUE_MAX_SIZE = 64
+
+ALREADY_COMPLETE = "The survey is already complete. Please start a new session to take the survey again."
 
 
 class SurveySession:
     """Manages a single survey session state"""
 
     def __init__(self):
-        self.conversation_agent = get_conversation_agent()
-        self.deps = Domain1SurveyDeps()
+        # Questions are routed deterministically; LLM calls happen inside answer_turn
+        self.flow = Domain1SurveyFlow()
+        self.deps = self.flow.deps
         self.is_complete = False
         self.result_data = None
+        # One turn at a time: concurrent submits for the same session must not share the flow
+        self.lock = asyncio.Lock()
 
     async def get_initial_greeting(self) -> str:
         """Get the agent's initial greeting and first question"""
-        result = await self.conversation_agent.run(
-            "Start the survey by greeting the respondent and then ask Q1.",
-            deps=self.deps,
-        )
-        agent_response = result.response.text
-        self.deps.conversation_history.append(f"Agent: {agent_response}")
-        return agent_response
+        return f"{GREETING} {self.flow.ask_current()}"
 
     async def process_response(self, user_input: str) -> str:
         """Process user input and get agent response"""
-        if self.is_complete:
-            return "The survey is already complete. Please start a new session to take the survey again."
-
-        # Add user input to history
-        self.deps.conversation_history.append(f"Respondent: {user_input}")
-
-        # Build prompt for next question
-        transcript = "\n".join(self.deps.conversation_history)
-        next_step_prompt = f"""You are continuing a fixed 6-question survey.
-
-        Transcript so far:
-        {transcript}
-
-        The respondent just answered: "{user_input}"
-
-        Rules:
-        - Ask only the NEXT required question from the 6-question script.
-        - Do not repeat earlier questions that have already been asked AND answered.
-        - If all six questions are answered, reply with SURVEY_COMPLETE (exactly)."""
-
-        result = await self.conversation_agent.run(next_step_prompt, deps=self.deps)
-        agent_response = result.response.text
-        self.deps.conversation_history.append(f"Agent: {agent_response}")
-
-        # Check if survey is complete
-        if "SURVEY_COMPLETE" in agent_response:
-            self.is_complete = True
-            await self._extract_data()
-            return self._format_completion_message()
-
-        return agent_response
+        async with self.lock:
+            if self.is_complete:
+                return ALREADY_COMPLETE
+
+            agent_response = await answer_turn(self.flow, user_input)
+
+            # Check if survey is complete
+            if self.flow.is_complete:
+                return await self._complete()
+
+            return agent_response
+
+    async def stream_response(self, user_input: str) -> AsyncIterator[str]:
+        """Like process_response, but yields the agent's reply so far as it streams in"""
+        async with self.lock:
+            if self.is_complete:
+                yield ALREADY_COMPLETE
+                return
+
+            chunks: asyncio.Queue[Optional[str]] = asyncio.Queue()
+            turn = asyncio.create_task(answer_turn(self.flow, user_input, on_delta=chunks.put_nowait))
+            turn.add_done_callback(lambda _: chunks.put_nowait(None))
+            text = ""
+            try:
+                while (chunk := await chunks.get()) is not None:
+                    # The flow is already complete when SURVEY_COMPLETE is emitted; never show it
+                    if chunk and not self.flow.is_complete:
+                        text += chunk
+                        yield text
+                agent_response = await turn
+            finally:
+                # The client went away mid-turn
+                turn.cancel()
+
+            if self.flow.is_complete:
+                yield await self._complete()
+            elif agent_response != text:
+                yield agent_response
+
+    async def _complete(self) -> str:
+        """Extract and save the results; returns the completion message"""
+        self.is_complete = True
+        await self._extract_data()
+        # The summary is computed once and shared by the saved file and the message
+        summary = self.result_data.get_risk_summary() if self.result_data else None
+        # Write the results file in a worker thread while the completion message is built
+        save = asyncio.create_task(asyncio.to_thread(self._save_results, summary))
+        message = self._format_completion_message(summary)
+        await save
+        return message
 
     async def _extract_data(self):
-        """Extract structured data from conversation"""
-        extraction_agent = get_extraction_agent()
-        conversation_text = "\n".join(self.deps.conversation_history)
-    
-        result = await extraction_agent.run(
-            f"Extract the household data from this conversation:\n\n{conversation_text}"
-        )
-        
-        answers: dict = result.output or {}
-    
-        self.result_data = Domain1Data.from_answers(
-            answers,
-            strict_len=False
-        )
-    
-        self._save_results()
+        """Extract structured data from the recorded answers"""
+        # Reuses the extraction answer_turn may already have started during the last validation
+        self.result_data = await extract_flow_data(self.flow)
 
-    def _save_results(self):
-        """Save survey results to file"""
+    def _save_results(self, summary: Optional[dict]):
+        """Save survey results to file (blocking; called through asyncio.to_thread)"""
         if not self.result_data:
             return
 
         output_dir = Path("survey_results")
         output_dir.mkdir(exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = output_dir / f"domain1_survey_{timestamp}.json"
+        # One clock read names the file and stamps its contents
+        now = datetime.now()
+        output_file = output_dir / f"domain1_survey_{now:%Y%m%d_%H%M%S}.json"
 
-        summary = self.result_data.get_risk_summary()
         output_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "domain": "Domain 1 - Demographics & Vulnerability Factors",
-            "data": self.result_data.model_dump(),
+            "data": self.result_data.model_dump(mode="json"),
             "summary": summary,
         }
 
-        with open(output_file, "w") as f:
-            json.dump(output_data, f, indent=2)
+        write_json(output_file, output_data)
 
-    def _format_completion_message(self) -> str:
+    def _format_completion_message(self, summary: Optional[dict]) -> str:
         """Format the completion message with risk summary"""
         if not self.result_data:
             return "Survey complete, but there was an error extracting data."
 
-        summary = self.result_data.get_risk_summary()
-
         message = """
 **Survey Complete!**
 
@@ -158,40 +166,103 @@ Domain Weight: {weight:.0%} | Weighted Score: {weighted:.2f}
         if self.result_data.children:
             message += "**Individual Child Vulnerability Scores:**\n\n"
             for i, child in enumerate(self.result_data.children, 1):
-                message += f"- **Child {i}**: {child.age_months} months ({child.age_range.value})"
+                if child.age_months is None:
+                    message += f"- **Child {i}**: Age unknown"
+                else:
+                    message += f"- **Child {i}**: {child.age_months} months ({child.age_range.value})"
                 if child.has_malnutrition_signs:
                     message += " - Malnutrition signs present"
-                message += f" - Score: {child.vulnerability_score:.2f}\n"
+                if child.vulnerability_score is not None:
+                    message += f" - Score: {child.vulnerability_score:.2f}"
+                message += "\n"
 
         message += "\n\n*Results have been saved. Click 'New Survey' to start again.*"
 
         return message
 
-
-# Global session storage (for demo - in production use proper session management)
-sessions = {}
+    def close(self):
+        """Drop background work of an abandoned session"""
+        if self.flow.extraction is not None and not self.flow.extraction.done():
+            self.flow.extraction.cancel()
+
+
+class SessionStore:
+    """
+    Bounded session storage: sessions idle for longer than `ttl` seconds and the
+    least recently used ones beyond `max_size` are dropped (and closed).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        # session_id -> (last access, session), oldest access first
+        self._items: OrderedDict[str, tuple[float, SurveySession]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, session_id: str) -> Optional[SurveySession]:
+        item = self._items.get(session_id)
+        if item is None:
+            return None
+        now = time.monotonic()
+        if now - item[0] > self.ttl:
+            del self._items[session_id]
+            item[1].close()
+            return None
+        self._items[session_id] = (now, item[1])
+        self._items.move_to_end(session_id)
+        return item[1]
+
+    def put(self, session_id: str, session: SurveySession):
+        old = self._items.pop(session_id, None)
+        if old is not None and old[1] is not session:
+            old[1].close()
+        self._items[session_id] = (time.monotonic(), session)
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._items:
+            session_id, (last_access, session) = next(iter(self._items.items()))
+            if len(self._items) <= self.max_size and now - last_access <= self.ttl:
+                break
+            del self._items[session_id]
+            session.close()
+
+
+# Global session storage (in-process; bounded so abandoned sessions don't accumulate)
+sessions = SessionStore()
+
+
+def new_session_id() -> str:
+    """Random, collision-safe session id"""
+    return secrets.token_hex(8)
 
 
 def get_or_create_session(session_id: str) -> SurveySession:
     """Get existing session or create new one"""
-    if session_id not in sessions:
-        sessions[session_id] = SurveySession()
-    return sessions[session_id]
+    session = sessions.get(session_id)
+    if session is None:
+        session = SurveySession()
+        sessions.put(session_id, session)
+    return session
 
 
 async def start_survey(session_id: str):
     """Start a new survey and return initial greeting"""
     # Create fresh session
-    sessions[session_id] = SurveySession()
-    session = sessions[session_id]
+    session = SurveySession()
+    sessions.put(session_id, session)
     greeting = await session.get_initial_greeting()
     return [{"role": "assistant", "content": greeting}]
 
 
 async def chat(message: str, history: list, session_id: str):
-    """Process chat message and return response"""
+    """Process chat message and yield the updated history as the response streams in"""
     if not message.strip():
-        return history
+        yield history
+        return
 
     session = get_or_create_session(session_id)
 
@@ -200,18 +271,23 @@ async def chat(message: str, history: list, session_id: str):
         greeting = await session.get_initial_greeting()
         history = [{"role": "assistant", "content": greeting}]
 
-    # Get agent response
-    response = await session.process_response(message)
-
-    # Add to history (Gradio 6.x format)
+    # Add to history (Gradio 6.x format); the reply is filled in as it arrives
     history.append({"role": "user", "content": message})
-    history.append({"role": "assistant", "content": response})
+    reply = {"role": "assistant", "content": ""}
+    history.append(reply)
 
-    return history
+    async for response in session.stream_response(message):
+        reply["content"] = response
+        yield history
 
 
 def create_app():
     """Create and configure the Gradio app"""
+    # Imported here so the session logic can be used without loading Gradio
+    import gradio as gr
+
+    # Agents are shared by all sessions; build them before the first request
+    prepare_agents()
 
     with gr.Blocks(title="Risk Profiler Survey Bot") as app:
         gr.Markdown(
@@ -228,7 +304,7 @@ def create_app():
         )
 
         # Session ID (hidden, for state management)
-        session_id = gr.State(value=lambda: datetime.now().strftime("%Y%m%d%H%M%S%f"))
+        session_id = gr.State(value=new_session_id)
 
         chatbot = gr.Chatbot(
             label="Survey Conversation",
@@ -265,30 +341,34 @@ def create_app():
             if not history:
                 # Start fresh survey if no history
                 session = SurveySession()
-                sessions[session_id] = session
+                sessions.put(session_id, session)
                 greeting = await session.get_initial_greeting()
                 history = [{"role": "assistant", "content": greeting}]
 
-            result = await chat(message, history, session_id)
-            return "", result
+            async for result in chat(message, history, session_id):
+                yield "", result
 
         async def handle_new_survey(session_id):
             # Generate new session ID for fresh start
-            new_session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            history = await start_survey(new_session_id)
-            return history, new_session_id
+            session_id = new_session_id()
+            history = await start_survey(session_id)
+            return history, session_id
 
         # Wire up events
         msg.submit(
             handle_submit,
             inputs=[msg, chatbot, session_id],
             outputs=[msg, chatbot],
+            concurrency_limit=CONCURRENCY_LIMIT,
+            concurrency_id="chat",
         )
 
         submit_btn.click(
             handle_submit,
             inputs=[msg, chatbot, session_id],
             outputs=[msg, chatbot],
+            concurrency_limit=CONCURRENCY_LIMIT,
+            concurrency_id="chat",
         )
 
         new_survey_btn.click(
@@ -299,10 +379,21 @@ def create_app():
 
         clear_btn.click(lambda: [], outputs=[chatbot])
 
+        # Open the provider connection on Gradio's event loop (the pool belongs to it)
+        # while the respondent reads the page, so the first LLM call skips the handshake
+        app.load(warm_up_connection, show_progress="hidden")
+
+    app.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=QUEUE_MAX_SIZE)
     return app
 
 
 if __name__ == "__main__":
+    import gradio as gr
+    from dotenv import load_dotenv
+
+    # Load environment variables
+    load_dotenv()
+
     app = create_app()
     app.launch(
         server_name="127.0.0.1",
@@ -0,0 +1,221 @@
+"""
+Client-side LLM response cache (SQLite) for repeat, test and demo runs.
+
+The survey script is fixed, so the set of distinct (question, normalized answer)
+pairs is small and repeats across runs. Identical requests are served from disk
+instead of paying another LLM round trip. Set LLM_CACHE=0 to disable.
+
+Entries expire after LLM_CACHE_TTL seconds (default 7 days) and the table is
+trimmed to the newest LLM_CACHE_MAX_ROWS rows. SQLite calls run in a worker
+thread so a commit never blocks the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(
+    os.getenv("LLM_CACHE_PATH", Path(__file__).parent / ".llm_cache" / "responses.sqlite3")
+)
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", 10_000))
+_PRUNE_EVERY = 100  # puts between prunes
+
+# One connection shared by the worker threads; sqlite3 objects aren't safe to use concurrently
+_lock = threading.Lock()
+_puts = 0
+
+
+def cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE", "1") != "0"
+
+
+_PUNCT_RE = re.compile(r"[^\w\s']+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """
+    Canonical form of user text for cache keys: case, punctuation and whitespace
+    insensitive, so "Yes." / "yes" / " YES! " share one entry.
+    """
+    s = _PUNCT_RE.sub(" ", str(text or "").lower())
+    return _SPACE_RE.sub(" ", s).strip()
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from the parts that determine the LLM output (128-bit BLAKE2b)."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _connection() -> sqlite3.Connection:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses "
+        "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL DEFAULT 0)"
+    )
+    # Caches written before expiry existed: their rows get created=0 and are pruned below
+    if "created" not in {row[1] for row in conn.execute("PRAGMA table_info(responses)")}:
+        conn.execute("ALTER TABLE responses ADD COLUMN created REAL NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+    _prune(conn)
+    return conn
+
+
+def _prune(conn: sqlite3.Connection):
+    """Delete expired rows, then the oldest rows beyond CACHE_MAX_ROWS."""
+    conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - CACHE_TTL,))
+    conn.execute(
+        "DELETE FROM responses WHERE key IN "
+        "(SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+        (CACHE_MAX_ROWS,),
+    )
+    conn.commit()
+
+
+def get(key: str) -> Optional[str]:
+    with _lock:
+        row = _connection().execute(
+            "SELECT value FROM responses WHERE key = ? AND created >= ?",
+            (key, time.time() - CACHE_TTL),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def put(key: str, value: str):
+    global _puts
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+            (key, value, time.time()),
+        )
+        _puts += 1
+        if _puts % _PRUNE_EVERY == 0:
+            _prune(conn)
+        else:
+            conn.commit()
+
+
+async def aget(key: str) -> Optional[str]:
+    """get() in a worker thread, for use on the event loop."""
+    return await asyncio.to_thread(get, key)
+
+
+async def aput(key: str, value: str):
+    """put() in a worker thread, for use on the event loop."""
+    await asyncio.to_thread(put, key, value)
+
+
+async def cached_run(agent, prompt: str, key: str, **run_kwargs) -> tuple[Any, Any]:
+    """
+    Run `agent` on `prompt` unless a cached output exists for `key`.
+
+    Returns (output, result); result is None on a cache hit.
+    """
+    adapter = TypeAdapter(agent.output_type)
+
+    if cache_enabled():
+        cached = await aget(key)
+        if cached is not None:
+            logger.debug("LLM cache hit for %s", key[:12])
+            return adapter.validate_json(cached), None
+
+    result = await agent.run(prompt, **run_kwargs)
+    if cache_enabled():
+        await aput(key, adapter.dump_json(result.output).decode("utf-8"))
+    return result.output, result
+
+
+def _partial_suffix(text: str, stop: str) -> int:
+    """Length of the longest tail of `text` that is a proper prefix of `stop`."""
+    for n in range(min(len(text), len(stop) - 1), 0, -1):
+        if stop.startswith(text[-n:]):
+            return n
+    return 0
+
+
+async def cached_run_stream(
+    agent, prompt: str, key: str, on_delta, stop: Optional[str] = None, **run_kwargs
+) -> tuple[str, Any]:
+    """
+    Like cached_run for text agents, but passes the reply to `on_delta` as it streams in.
+
+    A cache hit is delivered as a single chunk. If `stop` appears in the stream, the
+    stream is closed and nothing from `stop` onwards is passed on; the text before it is
+    returned and not cached. Returns (text, result); result is None on a hit or a stop.
+    """
+    adapter = TypeAdapter(str)
+
+    if cache_enabled():
+        cached = await aget(key)
+        if cached is not None:
+            logger.debug("LLM cache hit for %s", key[:12])
+            text = adapter.validate_json(cached)
+            on_delta(text)
+            return text, None
+
+    buf, sent = "", 0
+    async with agent.run_stream(prompt, **run_kwargs) as result:
+        async for delta in result.stream_text(delta=True):
+            buf += delta
+            if stop is None:
+                on_delta(delta)
+                continue
+            if stop in buf:
+                # Leaving the context closes the stream, so no further tokens are decoded
+                text = buf[: buf.index(stop)]
+                if len(text) > sent:
+                    on_delta(text[sent:])
+                return text, None
+            # Hold back a possible partial sentinel until the next chunk decides it
+            end = len(buf) - _partial_suffix(buf, stop)
+            if end > sent:
+                on_delta(buf[sent:end])
+                sent = end
+        text = await result.get_output()
+    if sent < len(text):
+        on_delta(text[sent:])
+    if cache_enabled():
+        await aput(key, adapter.dump_json(text).decode("utf-8"))
+    return text, result
+
+
+async def cached_run_stream_output(agent, prompt: str, key: str, on_partial, **run_kwargs) -> tuple[Any, Any]:
+    """
+    Like cached_run for structured-output agents, but passes each partially parsed
+    output to `on_partial` while the response streams in (nothing is passed on a hit).
+    Returns (output, result); result is None on a cache hit.
+    """
+    adapter = TypeAdapter(agent.output_type)
+
+    if cache_enabled():
+        cached = await aget(key)
+        if cached is not None:
+            logger.debug("LLM cache hit for %s", key[:12])
+            return adapter.validate_json(cached), None
+
+    async with agent.run_stream(prompt, **run_kwargs) as result:
+        async for partial in result.stream_output(debounce_by=None):
+            on_partial(partial)
+        output = await result.get_output()
+    if cache_enabled():
+        await aput(key, adapter.dump_json(output).decode("utf-8"))
+    return output, result
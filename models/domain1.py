@@ -4,11 +4,16 @@ Purpose: Identify vulnerable populations requiring targeted assessment
 """
 
 import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from enum import Enum
+from itertools import chain
 from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
+from util import parse_caregiver
+
 
 # =========================================================
 # ENUMS
@@ -33,22 +38,36 @@ class CaregiverType(str, Enum):
     @staticmethod
     def from_llm_value(v: Any) -> "CaregiverType":
         s = str(v or "").strip()
-        mapping = {
-            "Both parents": CaregiverType.BOTH_PARENTS,
-            "Single mother": CaregiverType.SINGLE_MOTHER,
-            "Single father": CaregiverType.SINGLE_FATHER,
-            "Grandparent": CaregiverType.GRANDPARENT,
-            "Other relative": CaregiverType.OTHER_RELATIVE,
-            "Other": CaregiverType.OTHER,
-            "Unknown": CaregiverType.UNKNOWN,
-        }
-        return mapping.get(s, CaregiverType.UNKNOWN)
+        ct = _CAREGIVER_BY_LABEL.get(s.lower())
+        if ct is not None:
+            return ct
+        # Anything else ("single mom", "grandma", free text) goes through the rule parser's
+        # ordered keyword table, so it maps by keyword instead of to Unknown. That is one
+        # precompiled search per rule; a single combined pattern measured no faster here.
+        return _CAREGIVER_BY_LABEL[parse_caregiver(s).lower()]
+
+
+# Lowercased category labels, so exact labels in any case are a single lookup
+_CAREGIVER_BY_LABEL = {ct.value.lower(): ct for ct in CaregiverType}
 
 
 # =========================================================
 # CHILD MODEL
 # =========================================================
 
+# Age buckets: lower bounds (months) of every range after the first, with the
+# range and base vulnerability score for each bucket, looked up via bisect.
+_AGE_BOUNDS = (6, 12, 24)
+_AGE_RANGES = (
+    ChildAgeRange.UNDER_6_MONTHS,
+    ChildAgeRange.SIX_TO_11_MONTHS,
+    ChildAgeRange.TWELVE_TO_23_MONTHS,
+    ChildAgeRange.TWO_TO_FIVE_YEARS,
+)
+_AGE_SCORES = (1.0, 2.26, 2.31, 1.5)
+_HIGH_RISK_AGE_RANGES = frozenset({ChildAgeRange.SIX_TO_11_MONTHS, ChildAgeRange.TWELVE_TO_23_MONTHS})
+
+
 class ChildInfo(BaseModel):
     age_months: Optional[int] = Field(None, ge=0, le=60)
     has_malnutrition_signs: Optional[bool] = None
@@ -57,28 +76,14 @@ class ChildInfo(BaseModel):
     def age_range(self) -> Optional[ChildAgeRange]:
         if self.age_months is None:
             return None
-        if self.age_months < 6:
-            return ChildAgeRange.UNDER_6_MONTHS
-        if self.age_months < 12:
-            return ChildAgeRange.SIX_TO_11_MONTHS
-        if self.age_months < 24:
-            return ChildAgeRange.TWELVE_TO_23_MONTHS
-        return ChildAgeRange.TWO_TO_FIVE_YEARS
+        return _AGE_RANGES[bisect_right(_AGE_BOUNDS, self.age_months)]
 
     @property
     def vulnerability_score(self) -> Optional[float]:
-        ar = self.age_range
-        if ar is None:
+        if self.age_months is None:
             return None
 
-        age_scores = {
-            ChildAgeRange.UNDER_6_MONTHS: 1.0,
-            ChildAgeRange.SIX_TO_11_MONTHS: 2.26,
-            ChildAgeRange.TWELVE_TO_23_MONTHS: 2.31,
-            ChildAgeRange.TWO_TO_FIVE_YEARS: 1.5,
-        }
-
-        score = age_scores[ar]
+        score = _AGE_SCORES[bisect_right(_AGE_BOUNDS, self.age_months)]
 
         if self.has_malnutrition_signs is True:
             score *= 1.14
@@ -90,8 +95,20 @@ class ChildInfo(BaseModel):
 # SURVEY DEPENDENCIES
 # =========================================================
 
-class Domain1SurveyDeps(BaseModel):
-    conversation_history: list[str] = Field(default_factory=list)
+@dataclass(slots=True)
+class Domain1SurveyDeps:
+    """Mutable per-run survey state; only mutated internally, so no validation is needed."""
+    # (role, text) turns; formatted into a transcript only when it is needed
+    conversation_history: list[tuple[str, str]] = field(default_factory=list)
+    # Compact "answers so far" snapshot: answer slot -> respondent's raw answer
+    answers: dict[str, str] = field(default_factory=dict)
+
+    def transcript(self, header: Optional[str] = None) -> str:
+        """The conversation as "Role: text" lines, optionally after a header, built in one join."""
+        lines = (f"{role}: {text}" for role, text in self.conversation_history)
+        if header is not None:
+            lines = chain((header,), lines)
+        return "\n".join(lines)
 
 
 class ValidationDecision(BaseModel):
@@ -104,18 +121,41 @@ class ValidationDecision(BaseModel):
 # SMALL HELPERS
 # =========================================================
 
-_NA_STRINGS = {"na", "n/a", "null", "none", "unknown", ""}
+_CHILD_KEY_RE = re.compile(r"child(\d+)_")
+
+# Accepted key aliases, most specific first
+_CHILD_AGE_KEYS = ("age_months", "age")
+_CHILD_MALNUTRITION_KEYS = ("has_malnutrition_signs", "malnutrition", "malnourished")
+_NUM_CHILDREN_KEYS = ("num_children_under_5", "num_children")
+_CAREGIVER_KEYS = ("primary_caregiver", "caregiver")
+
+
+def _first_present(d: Dict[str, Any], keys: tuple[str, ...]) -> Any:
+    """Value of the first of `keys` present in `d` (even if None), else None."""
+    for key in keys:
+        if key in d:
+            return d[key]
+    return None
+
+_NA_STRINGS = frozenset({"na", "n/a", "null", "none", "unknown", ""})
+
+_BOOL_MAP = {
+    "1": True, "true": True, "t": True, "yes": True, "y": True,
+    "0": False, "false": False, "f": False, "no": False, "n": False,
+}
 
 
 def _to_int_or_none(x: Any) -> Optional[int]:
     if x is None:
         return None
-    s = str(x).strip()
+    if isinstance(x, int) and not isinstance(x, bool):
+        return x
+    s = (x if isinstance(x, str) else str(x)).strip()
     if s.lower() in _NA_STRINGS:
         return None
     try:
         return int(s)
-    except Exception:
+    except ValueError:
         return None
 
 
@@ -124,20 +164,22 @@ def _to_bool_or_none(x: Any) -> Optional[bool]:
         return None
     if isinstance(x, bool):
         return x
-    v = str(x).strip().lower()
-    if v in {"1", "true", "t", "yes", "y"}:
-        return True
-    if v in {"0", "false", "f", "no", "n"}:
-        return False
-    if v in _NA_STRINGS:
-        return None
-    return None
+    v = (x if isinstance(x, str) else str(x)).strip().lower()
+    # Anything not in the map (including the NA strings) is None
+    return _BOOL_MAP.get(v)
 
 
 # =========================================================
 # MAIN DOMAIN MODEL
 # =========================================================
 
+_SINGLE_PARENT_CAREGIVERS = frozenset({CaregiverType.SINGLE_MOTHER, CaregiverType.SINGLE_FATHER})
+
+# Household multipliers applied to the average child score
+_CAREGIVER_MULTIPLIER = dict.fromkeys(_SINGLE_PARENT_CAREGIVERS, 1.15)
+_VULNERABLE_MEMBERS_MULTIPLIER = 1.10
+
+
 class Domain1Data(BaseModel):
 
     num_children_under_5: Optional[int] = Field(None, ge=0)
@@ -159,18 +201,21 @@ class Domain1Data(BaseModel):
 
     @property
     def overall_vulnerability_score(self) -> float:
-        scores = [c.vulnerability_score for c in self.children if c.vulnerability_score is not None]
-        if not scores:
+        score_sum, n_scored = 0.0, 0
+        for c in self.children:
+            score = c.vulnerability_score
+            if score is not None:
+                score_sum += score
+                n_scored += 1
+        return self._household_score(score_sum, n_scored)
+
+    def _household_score(self, child_score_sum: float, n_scored: int) -> float:
+        """Average child score times the household multiplier (0.0 when no child is scored)."""
+        if not n_scored:
             return 0.0
 
-        avg_child_score = sum(scores) / len(scores)
-        household_multiplier = 1.0
-
-        if self.primary_caregiver in (
-            CaregiverType.SINGLE_MOTHER,
-            CaregiverType.SINGLE_FATHER,
-        ):
-            household_multiplier *= 1.15
+        avg_child_score = child_score_sum / n_scored
+        household_multiplier = _CAREGIVER_MULTIPLIER.get(self.primary_caregiver, 1.0)
 
         has_vuln = self.has_vulnerable_members
         if has_vuln is None:
@@ -180,7 +225,7 @@ class Domain1Data(BaseModel):
             )
 
         if has_vuln is True:
-            household_multiplier *= 1.10
+            household_multiplier *= _VULNERABLE_MEMBERS_MULTIPLIER
 
         return round(avg_child_score * household_multiplier, 2)
 
@@ -189,45 +234,68 @@ class Domain1Data(BaseModel):
     # -----------------------------------------------------
 
     def get_risk_summary(self) -> dict:
-        high_risk_age_children = [
-            c for c in self.children
-            if c.age_range in (
-                ChildAgeRange.SIX_TO_11_MONTHS,
-                ChildAgeRange.TWELVE_TO_23_MONTHS,
-            )
-        ]
-
-        malnourished_children = [
-            c for c in self.children if c.has_malnutrition_signs is True
-        ]
+        # One pass over the children for both counts and the score average
+        high_risk_age_children = malnourished_children = 0
+        score_sum, n_scored = 0.0, 0
+        for c in self.children:
+            if c.age_range in _HIGH_RISK_AGE_RANGES:
+                high_risk_age_children += 1
+            if c.has_malnutrition_signs is True:
+                malnourished_children += 1
+            score = c.vulnerability_score
+            if score is not None:
+                score_sum += score
+                n_scored += 1
 
         vulnerable_members_present = (
             self.has_vulnerable_members is True
             or self.has_elderly_members is True
             or self.has_immunocompromised_members is True
         )
+        overall_vulnerability_score = self._household_score(score_sum, n_scored)
 
         return {
             "domain": "Demographics & Vulnerability Factors",
             "domain_weight": self.domain_weight,
             "total_children": self.num_children_under_5,
-            "high_risk_age_children": len(high_risk_age_children),
-            "malnourished_children": len(malnourished_children),
-            "single_parent_household": self.primary_caregiver
-            in (CaregiverType.SINGLE_MOTHER, CaregiverType.SINGLE_FATHER),
+            "high_risk_age_children": high_risk_age_children,
+            "malnourished_children": malnourished_children,
+            "single_parent_household": self.primary_caregiver in _SINGLE_PARENT_CAREGIVERS,
             "vulnerable_members_present": vulnerable_members_present,
-            "overall_vulnerability_score": self.overall_vulnerability_score,
+            "overall_vulnerability_score": overall_vulnerability_score,
             "weighted_score": round(
-                self.overall_vulnerability_score * self.domain_weight, 2
+                overall_vulnerability_score * self.domain_weight, 2
             ),
         }
 
+    def summary_table(self) -> list[str]:
+        """One printable block per child (age, malnutrition signs, vulnerability score)."""
+        yes_no = {True: "Yes", False: "No", None: "Unknown"}
+        return [
+            "Child {}:\n  Age: {}\n  Malnutrition Signs: {}\n  Vulnerability Score: {}".format(
+                i,
+                "Unknown" if c.age_months is None else "{} months ({})".format(c.age_months, c.age_range.value),
+                yes_no[c.has_malnutrition_signs],
+                "N/A" if c.vulnerability_score is None else "{:.2f}".format(c.vulnerability_score),
+            )
+            for i, c in enumerate(self.children, 1)
+        ]
+
     # -----------------------------------------------------
     # BUILDER
     # -----------------------------------------------------
 
     @classmethod
-    def from_answers(cls, answers: Dict[str, Any], *, strict_len: bool = False):
+    def from_answers(cls, answers: Dict[str, Any], *, strict_len: bool = False, trusted: bool = False):
+        """
+        Build Domain1Data from an answers dict (extractor output or rule-parsed answers).
+
+        trusted=True skips Pydantic validation (model_construct). Only use it for answers
+        produced by our own rule-based parser (already typed and range-checked); never
+        bypass validation for untrusted input such as LLM output.
+        """
+        make_child = ChildInfo.model_construct if trusted else ChildInfo
+        build = cls.model_construct if trusted else cls
 
         # -------------------------
         # Prefer children[] array
@@ -240,17 +308,12 @@ class Domain1Data(BaseModel):
                 if not isinstance(item, dict):
                     continue
 
-                age = _to_int_or_none(item.get("age_months", item.get("age")))
-                mal = _to_bool_or_none(
-                    item.get(
-                        "has_malnutrition_signs",
-                        item.get("malnutrition", item.get("malnourished")),
-                    )
-                )
+                age = _to_int_or_none(_first_present(item, _CHILD_AGE_KEYS))
+                mal = _to_bool_or_none(_first_present(item, _CHILD_MALNUTRITION_KEYS))
 
                 if age is not None or mal is not None:
                     children.append(
-                        ChildInfo(age_months=age, has_malnutrition_signs=mal)
+                        make_child(age_months=age, has_malnutrition_signs=mal)
                     )
 
         # -------------------------
@@ -258,8 +321,8 @@ class Domain1Data(BaseModel):
         # -------------------------
         if not children:
             max_index = 0
-            for key in answers.keys():
-                m = re.match(r"child(\d+)_", key)
+            for key in answers:
+                m = key.startswith("child") and _CHILD_KEY_RE.match(key)
                 if m:
                     max_index = max(max_index, int(m.group(1)))
 
@@ -269,13 +332,13 @@ class Domain1Data(BaseModel):
 
                 if age is not None or mal is not None:
                     children.append(
-                        ChildInfo(age_months=age, has_malnutrition_signs=mal)
+                        make_child(age_months=age, has_malnutrition_signs=mal)
                     )
 
         # -------------------------
         # Number of children
         # -------------------------
-        raw_n = answers.get("num_children_under_5", answers.get("num_children"))
+        raw_n = _first_present(answers, _NUM_CHILDREN_KEYS)
         n = _to_int_or_none(raw_n)
 
         if strict_len and isinstance(n, int) and len(children) != n:
@@ -290,11 +353,9 @@ class Domain1Data(BaseModel):
         has_elderly = _to_bool_or_none(answers.get("has_elderly_members"))
         has_immuno = _to_bool_or_none(answers.get("has_immunocompromised_members"))
 
-        caregiver = CaregiverType.from_llm_value(
-            answers.get("primary_caregiver", answers.get("caregiver"))
-        )
+        caregiver = CaregiverType.from_llm_value(_first_present(answers, _CAREGIVER_KEYS))
 
-        return cls(
+        return build(
             num_children_under_5=n,
             children=children,
             has_vulnerable_members=has_vulnerable,
@@ -37,17 +37,20 @@ User: I'm a single mother
 
     print("\nExtracted Data:")
     print("="*60)
-    print(type(result.response))
-    print(result.response)
+    output = result.output
+    print(type(output))
+    print(output)
 
-    if isinstance(result.response, Domain1Data):
+    # The extractor returns a plain dict; build the model from it
+    data = Domain1Data.from_answers(output) if isinstance(output, dict) else output
+    if isinstance(data, Domain1Data):
         print("\n✅ Successfully extracted Domain1Data!")
-        print(f"Number of children: {result.response.num_children_under_5}")
-        print(f"Children details: {result.response.children}")
-        print(f"Elderly members: {result.response.has_elderly_members}")
-        print(f"Primary caregiver: {result.response.primary_caregiver}")
+        print(f"Number of children: {data.num_children_under_5}")
+        print(f"Children details: {data.children}")
+        print(f"Elderly members: {data.has_elderly_members}")
+        print(f"Primary caregiver: {data.primary_caregiver}")
     else:
-        print(f"\n❌ Got unexpected type: {type(result.response)}")
+        print(f"\n❌ Got unexpected type: {type(output)}")
 
 if __name__ == "__main__":
     asyncio.run(test_extraction())
@@ -0,0 +1,101 @@
+"""Tests for the rule-based answer parsers in util.py"""
+import pytest
+
+from util import (
+    is_clear_answer,
+    needs_llm_extraction,
+    parse_age_months,
+    parse_clear_count,
+    parse_count,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2", 2),
+        ("two", 2),
+        ("none", 0),
+        ("no kids", 0),
+        ("no children", 0),
+        ("I have no child under five", 0),
+        ("no children under 5", 0),
+        ("2 kids under 5", 2),
+        ("3, no child is sick", 3),
+        ("2 kids, no kids older than that", 2),
+        ("25", None),
+        ("not sure", None),
+    ],
+)
+def test_parse_count(text, expected):
+    assert parse_count(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2", 2),
+        ("three", 3),
+        ("no kids", 0),
+        ("I have no child under five", 0),
+        ("I have 2 children under five years old", 2),
+        # A count alongside "no kids" is not clear
+        ("3, no child is sick", None),
+        ("2 kids, no kids older than that", None),
+        ("2 or 3", None),
+        ("maybe 2", None),
+    ],
+)
+def test_parse_clear_count(text, expected):
+    assert parse_clear_count(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("18", 18),
+        ("18 months, no", 18),
+        ("2 years, yes", 24),
+        ("3-year-old", 36),
+        # The unit must belong to the number; mixed units are not parsed
+        ("5 months, not yet a year, no", None),
+        ("about a year, yes; 4", None),
+        ("1 year 6 months", None),
+        ("8 or 9 months", None),
+        ("70 months", None),
+    ],
+)
+def test_parse_age_months(text, expected):
+    assert parse_age_months(text) == expected
+
+
+@pytest.mark.parametrize(
+    "slot, text, expected",
+    [
+        ("has_vulnerable_members", "no", True),
+        ("has_vulnerable_members", "Yes.", True),
+        ("has_vulnerable_members", "No elderly, but my husband has HIV", False),
+        ("has_vulnerable_members", "no old people, my son is on chemo", False),
+        ("child1", "18 months, no", True),
+        ("child1", "18 months; yes", True),
+        ("child1", "no; 18 months", True),
+        ("child1", "14 months, she has no appetite and is losing weight", False),
+        ("child1", "2 years, yes", False),
+        ("child1", "18", False),
+        ("primary_caregiver", "grandma", True),
+        ("primary_caregiver", "I'm a single mother", True),
+        # Possessive parents are the respondent's parents, so the validator decides
+        ("primary_caregiver", "my mother", False),
+        ("primary_caregiver", "my dad looks after them", False),
+        ("primary_caregiver", "my sister or the neighbour", False),
+    ],
+)
+def test_is_clear_answer(slot, text, expected):
+    assert is_clear_answer(slot, text) is expected
+
+
+def test_needs_llm_extraction():
+    answers = {"num_children_under_5": "1", "child1": "14 months, yes", "has_vulnerable_members": "no"}
+    assert not needs_llm_extraction(answers)
+    answers["has_vulnerable_members"] = "No elderly, but my husband has HIV"
+    assert needs_llm_extraction(answers)
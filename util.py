@@ -1,21 +1,30 @@
 """
 Utility functions for the Risk Profiler application
 """
+import json
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
 
 
 # Path to prompts directory
 PROMPTS_DIR = Path(__file__).parent / "prompts"
 
 
+@lru_cache(maxsize=8)
 def load_prompt(filename: str) -> str:
-    """Load a prompt from a markdown file"""
+    """Load a prompt from a markdown file (each file is read once per process)"""
     prompt_path = PROMPTS_DIR / filename
     return prompt_path.read_text(encoding="utf-8")
 
 
+@lru_cache(maxsize=1)
 def get_conversation_system_prompt() -> str:
     """Build the full conversation system prompt from components"""
     base_prompt = load_prompt("conversation_system_prompt.md")
@@ -23,16 +32,27 @@ def get_conversation_system_prompt() -> str:
     return f"{base_prompt}\n\n{questions}"
 
 
+@lru_cache(maxsize=1)
 def get_extraction_system_prompt() -> str:
     """Load the extraction system prompt"""
     return load_prompt("extraction_system_prompt.md")
 
 
+@lru_cache(maxsize=1)
 def get_validation_system_prompt() -> str:
     """Load the validation system prompt"""
     return load_prompt("validation_system_prompt.md")
 
 
+def write_json(path: Path, data: Any):
+    """Write data as indented JSON (orjson if installed). Blocking; run it via asyncio.to_thread."""
+    if orjson is not None:
+        Path(path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
 def load_questions() -> List[str]:
     """Parse survey questions from the markdown file"""
     content = load_prompt("survey_questions.md")
@@ -45,28 +65,217 @@ def load_questions() -> List[str]:
     return questions
 
 
-def extract_int_0_2(text: str) -> Optional[int]:
-    """Parse number of children (0/1/2) from respondent answer, if confident."""
-    if text is None:
-        return None
-    s = str(text).strip().lower()
+def is_clarification_request(text: str, slot: Optional[str] = None) -> bool:
+    """
+    Heuristic: is the respondent asking about the question instead of answering it?
+    A trailing "?" only counts when the text holds no answer for `slot`, so a hedged
+    answer like "2?" or "18 months, no?" is still recorded.
+    """
+    s = str(text or "").strip().lower()
+    phrases = (
+        "don't understand",
+        "do not understand",
+        "what do you mean",
+        "what does",
+        "can you repeat",
+        "could you repeat",
+        "please repeat",
+        "please explain",
+    )
+    if any(p in s for p in phrases):
+        return True
+    return s.endswith("?") and (slot is None or not has_slot_answer(slot, s))
+
+
+# -----------------------------
+# Rule-based answer parsing
+# -----------------------------
+# Keyword tables and patterns are built once at import, not per parse
+_NUM_RE = re.compile(r"\b(\d+)\b")
+_WORD_RE = re.compile(r"[a-z]+")
+_CHILD_SLOT_RE = re.compile(r"child\d+")
+# Hedges that make an otherwise parseable answer unclear ("no idea" contains "no")
+_UNSURE_RE = re.compile(r"not sure|no idea|don'?t know|do not know|unknown|maybe|\bna\b|\bn/a\b")
+
+_COUNT_WORDS = {
+    "zero": 0, "none": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# "no kids" / "no children" means a count of zero, unless a count is also given
+_NO_CHILDREN_RE = re.compile(r"\bno\s+(?:kids?|child(?:ren)?)\b")
+# The question's own qualifier ("under five"), which is not a count
+_UNDER_FIVE_RE = re.compile(r"\b(?:under|below|younger than|less than)\s+(?:5|five)\b(?:\s+years?(?:\s+old)?)?")
+
+_AGE_YEARS_RE = re.compile(r"\b\d+\s*-?\s*(?:years?|yrs?)\b")
+_YEAR_WORD_RE = re.compile(r"\b(?:years?|yrs?)\b")
+_MONTH_WORD_RE = re.compile(r"\b(?:months?|mos?)\b")
+
+# Answers accepted without the validator: the Yes/No must be the whole answer, or sit
+# right next to the age ("18 months; no"). "No elderly, but my husband has HIV" is not.
+_YES_NO_TOKEN = r"(?:yes|yeah|yep|yup|y|no|nope|n|none)"
+_AGE_TOKEN = r"\d+(?:\s*(?:months?|mos?))?(?:\s+old)?"
+_YES_NO_ONLY_RE = re.compile(rf"{_YES_NO_TOKEN}[.!]?")
+_CHILD_ANSWER_RE = re.compile(
+    rf"(?:{_AGE_TOKEN}\s*[,;.]?\s*{_YES_NO_TOKEN}|{_YES_NO_TOKEN}\s*[,;.]?\s*{_AGE_TOKEN})[.!]?"
+)
 
-    word_map = {"zero": 0, "none": 0, "one": 1, "two": 2}
-    for w, v in word_map.items():
-        if re.search(rf"\b{w}\b", s):
-            return v
+_YES = frozenset({"yes", "y", "yeah", "yep", "yup", "true", "si"})
+_NO = frozenset({"no", "n", "nope", "false", "none"})
 
-    m = re.search(r"\b([0-9]+)\b", s)
+# The one caregiver keyword table (also behind CaregiverType.from_llm_value).
+# Order matters: the first matching rule wins, and "grandmother" also contains "mother"
+_CAREGIVER_RULES = (
+    (re.compile(r"\bboth\b|\bshared?\b|\bequally\b|\btogether\b"), "Both parents"),
+    (re.compile(r"grand(ma|mother|pa|father|parent)|granny|\bnana\b"), "Grandparent"),
+    (re.compile(r"\baunt|\buncle|\bcousin|\bsister|\bbrother|\bsibling|\brelative"), "Other relative"),
+    (re.compile(r"\bmother\b|\bmom\b|\bmum\b|\bmama\b|\bmummy\b|\bmommy\b"), "Single mother"),
+    (re.compile(r"\bfather\b|\bdad\b|\bdaddy\b|\bpapa\b"), "Single father"),
+    (re.compile(r"\bnanny\b|babysitter|daycare|\bneighbou?r|\bmaid\b|\bhelper\b|\bother\b(?!\s+relative)"), "Other"),
+)
+
+# From a parent respondent, "my mother" / "my dad" is the children's grandparent
+_MY_PARENT_RE = re.compile(r"\bmy\s+(?:mother|mom|mum|mama|mummy|mommy|father|dad|daddy|papa)\b")
+
+
+def parse_count(text: str, max_n: int = 20) -> Optional[int]:
+    """Parse the number of children under five (0..max_n), digits or number words."""
+    s = _UNDER_FIVE_RE.sub(" ", str(text or "").strip().lower())
+
+    m = _NUM_RE.search(s)
     if m:
-        try:
-            v = int(m.group(1))
-            if v in (0, 1, 2):
-                return v
-        except Exception:
-            return None
+        v = int(m.group(1))
+        return v if 0 <= v <= max_n else None
 
-    # handle common "no kids"/"no children" -> 0
-    if re.search(r"\bno\b", s) and re.search(r"\bchild|children|kid|kids\b", s):
+    for w in _WORD_RE.findall(s):
+        if w in _COUNT_WORDS:
+            return _COUNT_WORDS[w]
+
+    # Only without a count: in "3, no child is sick" the "no child" is not the answer
+    if _NO_CHILDREN_RE.search(s):
         return 0
+    return None
 
+
+def parse_age_months(text: str) -> Optional[int]:
+    """
+    Parse a child's age in months (0..60). The number is converted from years only
+    when it carries the unit ("2 years"); a stray or mixed unit ("5 months, not yet
+    a year") leaves the age unparsed.
+    """
+    s = str(text or "").strip().lower()
+    numbers = _NUM_RE.findall(s)
+    if len(numbers) != 1:
+        return None
+    v = int(numbers[0])
+    if _YEAR_WORD_RE.search(s):
+        if _MONTH_WORD_RE.search(s) or not _AGE_YEARS_RE.search(s):
+            return None
+        v *= 12
+    return v if 0 <= v <= 60 else None
+
+
+def parse_yes_no(text: str) -> Optional[bool]:
+    """Parse a clear Yes/No answer; None if missing or conflicting."""
+    words = set(_WORD_RE.findall(str(text or "").lower()))
+    yes = not _YES.isdisjoint(words)
+    no = not _NO.isdisjoint(words)
+    if yes and not no:
+        return True
+    if no and not yes:
+        return False
     return None
+
+
+def parse_caregiver(text: str) -> str:
+    """Map a caregiver answer to a caregiver label (see CaregiverType); "Unknown" if unclear."""
+    s = str(text or "").strip().lower()
+    for pattern, label in _CAREGIVER_RULES:
+        if pattern.search(s):
+            return label
+    return "Unknown"
+
+
+def parse_answers(answers: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Rule-based parse of raw survey answers keyed by answer slot
+    (num_children_under_5, child{i}, has_vulnerable_members, primary_caregiver)
+    into the flat format accepted by Domain1Data.from_answers.
+
+    A combined child{i} answer is scanned for the age (a number) and for a Yes/No
+    about malnutrition. Separate child{i}_age / child{i}_malnutrition slots are
+    still understood.
+    """
+    parsed: Dict[str, Any] = {}
+    for slot, text in answers.items():
+        if slot == "num_children_under_5":
+            parsed[slot] = parse_count(text)
+        elif slot.endswith("_age"):
+            parsed[slot] = parse_age_months(text)
+        elif slot.endswith("_malnutrition") or slot == "has_vulnerable_members":
+            parsed[slot] = parse_yes_no(text)
+        elif slot == "primary_caregiver":
+            parsed[slot] = parse_caregiver(text)
+        elif _CHILD_SLOT_RE.fullmatch(slot):
+            parsed[f"{slot}_age"] = parse_age_months(text)
+            parsed[f"{slot}_malnutrition"] = parse_yes_no(text)
+    return parsed
+
+
+def needs_llm_extraction(answers: Dict[str, str]) -> bool:
+    """
+    True if any recorded answer is not one `is_clear_answer` reads unambiguously.
+    Those answers were accepted by the LLM validator, and the rule-based parse of
+    them may miss or flip a value, so the LLM extractor has to read the survey.
+    """
+    return not all(is_clear_answer(slot, text) for slot, text in answers.items())
+
+
+def has_slot_answer(slot: str, text: str) -> bool:
+    """True if the rule parser finds any value for `slot` in the text, clear or not."""
+    if slot == "num_children_under_5":
+        return parse_count(text) is not None
+    if _CHILD_SLOT_RE.fullmatch(slot):
+        return parse_age_months(text) is not None or parse_yes_no(text) is not None
+    if slot == "has_vulnerable_members":
+        return parse_yes_no(text) is not None
+    if slot == "primary_caregiver":
+        return parse_caregiver(text) != "Unknown"
+    return False
+
+
+def parse_clear_count(text: str, max_n: int = 20) -> Optional[int]:
+    """The number of children if the answer holds exactly one count (digits or a number word), else None."""
+    s = _UNDER_FIVE_RE.sub(" ", str(text or "").strip().lower())
+    if _UNSURE_RE.search(s):
+        return None
+    counts = _NUM_RE.findall(s) + [w for w in _WORD_RE.findall(s) if w in _COUNT_WORDS]
+    no_children = _NO_CHILDREN_RE.search(s) is not None
+    if not counts:
+        return 0 if no_children else None
+    # A count next to "no kids" ("2 kids, no kids older than that") is left to the validator
+    if len(counts) != 1 or no_children:
+        return None
+    return parse_count(s, max_n)
+
+
+def is_clear_answer(slot: str, text: str) -> bool:
+    """
+    True if the rule parser reads the answer for `slot` unambiguously, so it can be
+    accepted without asking the LLM validator. Anything doubtful returns False.
+    """
+    s = str(text or "").strip().lower()
+    if not s or _UNSURE_RE.search(s):
+        return False
+    if slot == "num_children_under_5":
+        return parse_clear_count(s) is not None
+    if _CHILD_SLOT_RE.fullmatch(slot):
+        # Only "<n> [months]" next to a bare Yes/No; ages in years go to the validator
+        return _CHILD_ANSWER_RE.fullmatch(s) is not None and parse_age_months(s) is not None
+    if slot == "has_vulnerable_members":
+        return _YES_NO_ONLY_RE.fullmatch(s) is not None
+    if slot == "primary_caregiver":
+        if _MY_PARENT_RE.search(s):
+            return False
+        return sum(1 for pattern, _ in _CAREGIVER_RULES if pattern.search(s)) == 1
+    return False